@@ -4,17 +4,24 @@
     For more information, visit https://github.com/zapier/email-reply-parser
 """
 
+import functools
+import itertools
+import os
 import re
-from typing import Optional, List
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Iterable, Optional, List, Tuple
 import unidecode
 
+if TYPE_CHECKING:
+    from multiprocessing.context import BaseContext
+
 
 class EmailReplyParser(object):
     """ Represents an email message that is parsed.
     """
 
     @staticmethod
-    def read(text):
+    def read(text: str) -> 'EmailMessage':
         """ Factory method that splits email into list of fragments
 
             text - A string email body
@@ -24,7 +31,7 @@ class EmailReplyParser(object):
         return EmailMessage(text).read()
 
     @staticmethod
-    def parse_reply(text):
+    def parse_reply(text: str) -> str:
         """ Provides the reply portion of email.
 
             text - A string email body
@@ -33,8 +40,14 @@ class EmailReplyParser(object):
         """
         return EmailReplyParser.read(text).reply
 
+    # Emails are often cleaned more than once in a pipeline (e.g. for display and again for indexing), so keep the most
+    # recent results around. Only bodies shorter than this many characters are cached, which keeps the cache to a few MB
+    # at most; set it to 0 to turn caching off, and use clear_cache() to drop anything already held (e.g. after
+    # replacing one of EmailMessage's patterns)
+    CACHE_MAX_BODY_LENGTH = 4096
+
     @staticmethod
-    def cut_off_at_signature(body: str, include: Optional[bool] = True, word_limit: Optional[int] = 100):
+    def cut_off_at_signature(body: str, include: Optional[bool] = True, word_limit: Optional[int] = 100) -> str:
         """
         Remove the signature section from an email, and use the email Reply Parser to try to remove any
         "thread" content.
@@ -46,9 +59,73 @@ class EmailReplyParser(object):
         be retained. If a word-limit is set, the email will be cut-off after that limit if a signature is not
         found before that point. Default = 100.
         """
-        parsed_email = EmailReplyParser.parse_reply(body)
-        cleaned_email = EmailMessage.clean_email_content(parsed_email, include, word_limit)
-        return cleaned_email.strip()
+        if len(body) < EmailReplyParser.CACHE_MAX_BODY_LENGTH:
+            # Only include=True keeps the sign-off, so key on that rather than on whatever value was passed (1 == True).
+            # The header warnings are part of the key too, as callers may add their own to the list
+            return EmailReplyParser._cached_cut_off_at_signature(
+                body, include is True, word_limit, tuple(EmailMessage.EMAIL_HEADER_WARNINGS)
+            )
+        return EmailReplyParser.read(body).cut_off_at_signature(include, word_limit)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256, typed=True)
+    def _cached_cut_off_at_signature(
+            body: str,
+            include: bool,
+            word_limit: Optional[int],
+            header_warnings: Tuple[str, ...]
+    ) -> str:
+        # header_warnings is only there for the cache key, cleaning reads EmailMessage.EMAIL_HEADER_WARNINGS itself
+        return EmailReplyParser.read(body).cut_off_at_signature(include, word_limit)
+
+    @staticmethod
+    def clear_cache() -> None:
+        """ Drops all the emails held in the cut_off_at_signature cache
+        """
+        EmailReplyParser._cached_cut_off_at_signature.cache_clear()
+
+    # Batches smaller than this are cleaned in the calling process, where they finish sooner than a pool of worker
+    # processes can start up
+    PARSE_BATCH_MIN_POOL_SIZE = 100
+
+    @staticmethod
+    def parse_batch(
+            bodies: Iterable[str],
+            include: Optional[bool] = True,
+            word_limit: Optional[int] = 100,
+            max_workers: Optional[int] = None,
+            mp_context: Optional['BaseContext'] = None
+    ) -> List[str]:
+        """
+        Run cut_off_at_signature over a batch of emails, spread across a pool of worker processes.
+        :param bodies: The email strings to be parsed and cleaned.
+        :param include: As for cut_off_at_signature.
+        :param word_limit: As for cut_off_at_signature.
+        :param max_workers: Number of worker processes. Defaults to the number of CPUs. With 1, or for batches of fewer
+            than PARSE_BATCH_MIN_POOL_SIZE emails, the batch is cleaned in this process without starting a pool.
+        :param mp_context: Multiprocessing context used to start the workers. Defaults to the platform's default start
+            method.
+        :return: The cleaned emails, in the same order as the bodies.
+        """
+        # Checked up front, the same way ProcessPoolExecutor does, so a bad value fails whatever the batch size
+        if max_workers is not None and max_workers <= 0:
+            raise ValueError("max_workers must be greater than 0")
+
+        clean = functools.partial(EmailReplyParser.cut_off_at_signature, include=include, word_limit=word_limit)
+        bodies = list(bodies)
+        if max_workers == 1 or len(bodies) < EmailReplyParser.PARSE_BATCH_MIN_POOL_SIZE:
+            return list(map(clean, bodies))
+
+        # Send the emails over in chunks to keep the inter-process overhead down, while still giving every worker a few
+        # chunks so the work stays spread out when some emails take longer than others
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(bodies) // (workers * 4))
+
+        # Imported here as it pulls in multiprocessing and friends, which most users of the parser never need
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+            return list(executor.map(clean, bodies, chunksize=chunksize))
 
 
 class EmailMessage(object):
@@ -56,36 +133,30 @@ class EmailMessage(object):
         The regexes cover English, Italian, Swedish, Finnish, Danish, German, Portuguese, Polish, French to date.
     """
     SENT_FROM_DEVICE_REGEX = re.compile(
-        r"(^--|^__|^\* \* \*)"
-        r"|(^Sent from .{,50}$)"  # English
-        r"|(^Sent using the mobile mail app)"  # English
-        r"|(^Get Outlook for .{,50}$)"  # English
-        r"|(^Sendt fra .{,50}$)"  # Danish
-        r"|(^Verstuurd vanaf.{,50}$)"  # Dutch
-        r"|(^Verzonden vanuit .{,50}$)"  # Dutch
-        r"|(^Hanki .{,50}$)"  # Finnish
-        r"|(^Lahetetty .{,50}$)"  # Finnish
-        r"|(^Envoye de .{,50}$)"  # French
-        r"|(^Envoye depuis .{,50}$)"  # French
-        r"|(^Envoye a partir .{,50}$)"  # French
-        r"|(^Gesendet mit.{,50}$)"  # German
-        r"|(^Gesendet von.{,50}$)"  # German
-        r"|(^Estale apo .{,50}$)"  # Greek
-        r"|(.{0,50} kuldve$)"  # Hungarian
-        r"|(^Inviato da .{,50}$)"  # Italian
-        r"|(^Inviato dal .{,50}$)"  # Italian
-        r"|(^Wyslane z .{,50}$)"  # Polish
-        r"|(^Wysłane z .{,50}$)"  # Polish
-        r"|(^Enviado de .{,50}$)"  # Portuguese
-        r"|(^Enviado desde .{,50}$)"  # Portuguese
-        r"|(^Enviado do .{,50}$)"  # Portuguese
-        r"|(^Enviado a partir .{,50}$)"  # Portuguese
-        r"|(^Obter o Outlook .{,50}$)"  # Portuguese
-        r"|(^Obtener Outlook .{,50}$)"  # Spanish
-        r"|(^Trimis de pe .{,50}$)"  # Romanian
-        r"|(^Skickat från .{,50}$)"  # Swedish
-        r"|(^Skickat fran .{,50}$)"  # Swedish
-        r"|(^Στάλθηκε από .{,50}$)",  # Greek
+        # Apart from the Hungarian one every alternative is anchored to the start of a line, so test the anchor once up
+        # front instead of trying each alternative at every offset of the body. Phrases sharing a prefix in the same
+        # language are merged so that prefix is only matched once
+        r"^(?:--|__|\* \* \*"
+        r"|Sent from .{,50}$"  # English
+        r"|Sent using the mobile mail app"  # English
+        r"|Get Outlook for .{,50}$"  # English
+        r"|Sendt fra .{,50}$"  # Danish
+        r"|Verstuurd vanaf.{,50}$"  # Dutch
+        r"|Verzonden vanuit .{,50}$"  # Dutch
+        r"|Hanki .{,50}$"  # Finnish
+        r"|Lahetetty .{,50}$"  # Finnish
+        r"|Envoye (?:de|depuis|a partir) .{,50}$"  # French
+        r"|Gesendet (?:mit|von).{,50}$"  # German
+        r"|Estale apo .{,50}$"  # Greek
+        r"|Inviato dal? .{,50}$"  # Italian
+        r"|Wys[lł]ane z .{,50}$"  # Polish
+        r"|Enviado (?:de|desde|do|a partir) .{,50}$"  # Portuguese
+        r"|Obter o Outlook .{,50}$"  # Portuguese
+        r"|Obtener Outlook .{,50}$"  # Spanish
+        r"|Trimis de pe .{,50}$"  # Romanian
+        r"|Skickat fr[åa]n .{,50}$"  # Swedish
+        r"|Στάλθηκε από .{,50}$)"  # Greek
+        r"|(.{0,50} kuldve$)",  # Hungarian
         flags=re.MULTILINE
     )
 
@@ -127,6 +198,7 @@ class EmailMessage(object):
         r"|Dne.*napsal(.*?):$"  # Czech
     )
 
+    # Not used by the parser, which checks for a leading ">" directly in _scan_line, so replacing it has no effect
     QUOTED_REGEX = re.compile(r"(>+)")
     HEADER_REGEX = re.compile(
         r"(^(\*+)?.|^(\*)?)(From|Sent|To|Subject"  # English - Need ^(\*+)?. to catch any number of asterisks before
@@ -144,45 +216,53 @@ class EmailMessage(object):
         r"|De|Enviado|A|Asunto"  # Spanish
         r"|De|Enviado|Para|Assunto|Data):\*?"  # Portuguese
     )
+    # Each header allows up to 120 characters, an optional line break, then up to 50 more characters before the closing
+    # phrase. Spelling that out as "one line of up to 170 or two lines of 120 + 50" matches exactly the same text, but
+    # avoids backtracking through every 120 x 50 split whenever a short prefix such as "ma " or "ti " turns up mid-word
     _MULTI_QUOTE_HDR_REGEX = (
-        r"(On (.{,120})\n?(.{,50})?wrote(\s+)?:"  # English
-        r"|Il (.{,120})\n?(.{,50})?ha(\s+)?:"  # Italian
-        r"|Il (.{,120})\n?(.{,50})?ha(\s+)?scritto:"  # Italian
-        r"|mån (.{,120})\n?(.{,50})?skrev(\s+)?:"  # Swedish
-        r"|man (.{,120})\n?(.{,50})?skrev(\s+):"  # Swedish
-        r"|tis (.{,120})\n?(.{,50})?skrev(\s+):"  # Norwegian
-        r"|tors (.{,120})\n?(.{,50})?skrev(\s+):"  # Norwegian
-        r"|ons (.{,120})\n?(.{,50})?skrev(\s+):"  # Norwegian
-        r"|Am (.{,120})\n?(.{,50})?schrieb(\s+)?::"  # German
-        r"|ma (.{,120})\n?(.{,50})?kirjoitti(\s+)?:"  # Finnish
-        r"|ti (.{,120})\n?(.{,50})?kirjoitti(\s+)?:"  # Finnish
-        r"|pe (.{,120})\n?(.{,50})?kirjoitti(\s+)?:"  # Finnish
-        r"|ke (.{,120})\n?(.{,50})?kirjoitti(\s+)?:"  # Finnish
-        r"|fre (.{,120})\n?(.{,50})?skrev(\s+)?:"  # Danish
-        r"|Den (.{,120})\n?(.{,50})?skrev(\s+)?:"  # Danish
-        r"|tir (.{,120})\n?(.{,50})?skrev(\s+)?:"  # Danish
-        r"|Op (.{,120})\n?(.{,50})?schreef(\s+)?:"  # Dutch
-        r"|Op (.{,120})\n?(.{,50})?geschreven(\s+)?:"  # Dutch
-        r"|A (.{,120})\n?(.{,50})?escreveu(\s+)?:"  # Portuguese
-        r"|No dia (.{,120})\n?(.{,50})?escreveu(\s+)?:"  # Portuguese
-        r"|El (.{,120})\n?(.{,50})?escribio(\s+)?:"  # Spanish
-        r"|El (.{,120})\n?(.{,50})?escribió(\s+)?:"  # Spanish
-        r"|Le (.{,120})\n?(.{,50})?ecrit(\s+)?:"  # French
-        r"|Le (.{,120})\n?(.{,50})?écrit(\s+)?:"  # French
-        r"|Dna (.{,120})\n?(.{,50})?napisala\(a\)(\s+)?:"  # Slovak
-        r"|po (.{,120})\n?(.{,50})?napisal\(a\)(\s+)?:"  # Slovak
-        r"|Dnia (.{,120})\n?(.{,50})?napisal\(a\)(\s+)?:" # Polish
-        r"|Dnia (.{,120})\n?(.{,50})?napisał\(a\)(\s+)?:" # Polish
-        r"|W dniu (.{,120})\n?(.{,50})?napisal(\s+)?:" # Polish
-        r"|W dniu (.{,120})\n?(.{,50})?napisał(\s+)?:" # Polish
-        r"|Wiadomość napisana (.{,120})\n?(.{,50})?o godz" # Polish
-        r"|Wiadomosc napisana (.{,120})\n?(.{,50})?o godz" # Polish
-        r"|Temat: (.{,120})\n?(.{,50})?Adresat:" # Polish
-        r"|Στις (.{,120})\n?(.{,50})?έγραψε(\s+)?:"  # Greek
+        r"(On (?:.{,170}|.{,120}\n.{,50})wrote(\s+)?:"  # English
+        r"|Il (?:.{,170}|.{,120}\n.{,50})ha(\s+)?:"  # Italian
+        r"|Il (?:.{,170}|.{,120}\n.{,50})ha(\s+)?scritto:"  # Italian
+        r"|mån (?:.{,170}|.{,120}\n.{,50})skrev(\s+)?:"  # Swedish
+        r"|man (?:.{,170}|.{,120}\n.{,50})skrev(\s+):"  # Swedish
+        r"|tis (?:.{,170}|.{,120}\n.{,50})skrev(\s+):"  # Norwegian
+        r"|tors (?:.{,170}|.{,120}\n.{,50})skrev(\s+):"  # Norwegian
+        r"|ons (?:.{,170}|.{,120}\n.{,50})skrev(\s+):"  # Norwegian
+        r"|Am (?:.{,170}|.{,120}\n.{,50})schrieb(\s+)?::"  # German
+        r"|ma (?:.{,170}|.{,120}\n.{,50})kirjoitti(\s+)?:"  # Finnish
+        r"|ti (?:.{,170}|.{,120}\n.{,50})kirjoitti(\s+)?:"  # Finnish
+        r"|pe (?:.{,170}|.{,120}\n.{,50})kirjoitti(\s+)?:"  # Finnish
+        r"|ke (?:.{,170}|.{,120}\n.{,50})kirjoitti(\s+)?:"  # Finnish
+        r"|fre (?:.{,170}|.{,120}\n.{,50})skrev(\s+)?:"  # Danish
+        r"|Den (?:.{,170}|.{,120}\n.{,50})skrev(\s+)?:"  # Danish
+        r"|tir (?:.{,170}|.{,120}\n.{,50})skrev(\s+)?:"  # Danish
+        r"|Op (?:.{,170}|.{,120}\n.{,50})schreef(\s+)?:"  # Dutch
+        r"|Op (?:.{,170}|.{,120}\n.{,50})geschreven(\s+)?:"  # Dutch
+        r"|A (?:.{,170}|.{,120}\n.{,50})escreveu(\s+)?:"  # Portuguese
+        r"|No dia (?:.{,170}|.{,120}\n.{,50})escreveu(\s+)?:"  # Portuguese
+        r"|El (?:.{,170}|.{,120}\n.{,50})escribio(\s+)?:"  # Spanish
+        r"|El (?:.{,170}|.{,120}\n.{,50})escribió(\s+)?:"  # Spanish
+        r"|Le (?:.{,170}|.{,120}\n.{,50})ecrit(\s+)?:"  # French
+        r"|Le (?:.{,170}|.{,120}\n.{,50})écrit(\s+)?:"  # French
+        r"|Dna (?:.{,170}|.{,120}\n.{,50})napisala\(a\)(\s+)?:"  # Slovak
+        r"|po (?:.{,170}|.{,120}\n.{,50})napisal\(a\)(\s+)?:"  # Slovak
+        r"|Dnia (?:.{,170}|.{,120}\n.{,50})napisal\(a\)(\s+)?:" # Polish
+        r"|Dnia (?:.{,170}|.{,120}\n.{,50})napisał\(a\)(\s+)?:" # Polish
+        r"|W dniu (?:.{,170}|.{,120}\n.{,50})napisal(\s+)?:" # Polish
+        r"|W dniu (?:.{,170}|.{,120}\n.{,50})napisał(\s+)?:" # Polish
+        r"|Wiadomość napisana (?:.{,170}|.{,120}\n.{,50})o godz" # Polish
+        r"|Wiadomosc napisana (?:.{,170}|.{,120}\n.{,50})o godz" # Polish
+        r"|Temat: (?:.{,170}|.{,120}\n.{,50})Adresat:" # Polish
+        r"|Στις (?:.{,170}|.{,120}\n.{,50})έγραψε(\s+)?:"  # Greek
         r")"
     )
     MULTI_QUOTE_HDR_REGEX = re.compile(_MULTI_QUOTE_HDR_REGEX)
 
+    # The line break between a line of text and an Outlook style signature boundary line (e.g. "________"). Starting
+    # the pattern with the literal line break lets the regex engine jump between line breaks rather than testing the
+    # lookarounds at every character
+    OUTLOOK_BOUNDARY_REGEX = re.compile(r"\n(?<=[^\n]\n)(?= ?[_-]{7,})")
+
     EMAIL_SIGNOFF_REGEX = re.compile(
         r"((regards|kind regards|warm regards|best regards|best wishes|sincerely|best|cheers|"
         r"cordialement|très cordialement|bien cordialement|bien a vous|merci d'avance|d'avance merci|"
@@ -196,18 +276,32 @@ class EmailMessage(object):
         r"(Pozdrawiam.?|Z powazaniem|z pozdrowieniami)",
         flags=re.IGNORECASE
     )
+    # Each space or line break ends a word when applying a word limit
+    WORD_SEPARATOR_REGEX = re.compile(r"[ \n]")
+
+    # Run of word-terminated lines (e.g. a name and job title) directly after a sign-off
+    EMAIL_SIGNATURE_REGEX = re.compile(r"((\w+)[\n.])+|\Z", flags=re.IGNORECASE)
+
+    # unidecode works one character at a time and leaves ASCII alone, so only runs of non-ASCII characters need passing
+    # through it. Its output for the accented Latin range, which covers nearly all of our (mostly European) emails, is
+    # precomputed once so those runs can go through str.translate instead of a Python-level loop
+    NON_ASCII_REGEX = re.compile(r"[^\x00-\x7f]+")
+    _TRANSLITERATION_TABLE = {
+        code_point: unidecode.unidecode(chr(code_point)) for code_point in range(0x80, 0x250)
+    }
 
     EMAIL_HEADER_WARNINGS = [
         "CAUTION:This message is from an EXTERNAL SENDER - be CAUTIOUS, Do NOT Click any links or Open any attachments if you were not expecting them."
     ]
 
-    def __init__(self, text):
-        self.fragments = []
-        self.fragment = None
+    def __init__(self, text: str):
+        self.fragments: List[Fragment] = []
+        self.fragment: Optional[Fragment] = None
         self.text = text.replace('\r\n', '\n')
+        self.lines: Optional[List[str]] = None
         self.found_visible = False
 
-    def read(self):
+    def read(self) -> 'EmailMessage':
         """ Creates new fragment for each line
             and labels as a signature, quote, or hidden.
 
@@ -216,19 +310,21 @@ class EmailMessage(object):
 
         self.found_visible = False
 
-        is_multi_quote_header = self.MULTI_QUOTE_HDR_REGEX.search(self.text.strip())
+        stripped_text = self.text.strip()
+        is_multi_quote_header = self.MULTI_QUOTE_HDR_REGEX.search(stripped_text)
         if is_multi_quote_header:
-            self.text = self.text.strip()[:is_multi_quote_header.start()]
+            self.text = stripped_text[:is_multi_quote_header.start()]
 
         # Fix any outlook style replies, with the reply immediately above the signature boundary line
         #   See email_2_2.txt for an example
-        self.text = re.sub('([^\n])(?=\n ?[_-]{7,})', '\\1\n', self.text, re.MULTILINE)
+        self.text = self.OUTLOOK_BOUNDARY_REGEX.sub('\n\n', self.text)
 
         self.lines = self.text.split('\n')
-        self.lines.reverse()
 
-        for line in self.lines:
-            self._scan_line(line)
+        # Look the bound method up once rather than on every line
+        scan_line = self._scan_line
+        for line in reversed(self.lines):
+            scan_line(line)
 
         self._finish_fragment()
 
@@ -237,38 +333,47 @@ class EmailMessage(object):
         return self
 
     @property
-    def reply(self):
+    def reply(self) -> str:
         """ Captures reply message within email
         """
-        reply = []
-        for f in self.fragments:
-            if not (f.hidden or f.quoted):
-                reply.append(f.content)
-        return '\n'.join(reply)
+        return '\n'.join(f.content for f in self.fragments if not (f.hidden or f.quoted))
 
-    def _scan_line(self, line):
+    def cut_off_at_signature(self, include: Optional[bool] = True, word_limit: Optional[int] = 100) -> str:
+        """ Cuts the reply off at its signature, as EmailReplyParser.cut_off_at_signature does for a raw email body,
+            but reusing the fragments this message has already read rather than parsing the text again
+        """
+        if self.lines is None:
+            self.read()
+        cleaned_email = EmailMessage.clean_email_content(self.reply, include, word_limit)
+        return cleaned_email.strip()
+
+    def _scan_line(self, line: str) -> None:
         """ Reviews each line in email message and determines fragment type
             line - a row of text from an email message
         """
-        is_quote_header = self.QUOTE_HDR_REGEX.match(line.strip()) is not None
-        is_quoted = self.QUOTED_REGEX.match(line) is not None
-        is_header = is_quote_header or self.HEADER_REGEX.match(line) is not None
-
-        if self.fragment and len(line.strip()) == 0:
-            if self.SENT_FROM_DEVICE_REGEX.match(self.fragment.lines[-1].strip()):
+        stripped_line = line.strip()
+        is_blank = not stripped_line
+        # Every header pattern needs some word characters, so blank lines can skip both regexes
+        is_quote_header = not is_blank and self.QUOTE_HDR_REGEX.match(stripped_line) is not None
+        # A line is quoted when its first character is a ">"
+        is_quoted = line.startswith('>')
+        is_header = is_quote_header or (not is_blank and self.HEADER_REGEX.match(line) is not None)
+
+        if self.fragment and is_blank:
+            if self.SENT_FROM_DEVICE_REGEX.match(self.fragment.lines[0].strip()):
                 self.fragment.signature = True
                 self._finish_fragment()
 
         if self.fragment \
                 and ((self.fragment.headers == is_header and self.fragment.quoted == is_quoted) or
-                     (self.fragment.quoted and (is_quote_header or len(line.strip()) == 0))):
+                     (self.fragment.quoted and (is_quote_header or is_blank))):
 
-            self.fragment.lines.append(line)
+            self.fragment.lines.appendleft(line)
         else:
             self._finish_fragment()
             self.fragment = Fragment(is_quoted, line, headers=is_header)
 
-    def quote_header(self, line):
+    def quote_header(self, line: str) -> bool:
         """ Determines whether line is part of a quoted area
 
             line - a row of the email message
@@ -277,7 +382,7 @@ class EmailMessage(object):
         """
         return self.QUOTE_HDR_REGEX.match(line[::-1]) is not None
 
-    def _finish_fragment(self):
+    def _finish_fragment(self) -> None:
         """ Creates fragment
         """
 
@@ -293,7 +398,7 @@ class EmailMessage(object):
                 if self.fragment.quoted \
                         or self.fragment.headers \
                         or self.fragment.signature \
-                        or (len(self.fragment.content.strip()) == 0):
+                        or not self.fragment.content:
 
                     self.fragment.hidden = True
                 else:
@@ -302,29 +407,28 @@ class EmailMessage(object):
         self.fragment = None
 
     @staticmethod
-    def clean_email_content(body, include: Optional[bool], word_limit: Optional[int]):
+    def clean_email_content(body: str, include: Optional[bool], word_limit: Optional[int]) -> str:
         """
         Determines if a signature can be found and if so, whether to end the email before or after the signature.
         """
         # Make unidecode copy of body to check against SENT_FROM_DEVICE_REGEX and EMAIL_SIGNOFF_REGEX
-        body_clean = unidecode.unidecode(body)
-
-        # Find sign-off or sent from device match for unidecode copy
-        signoff_matches = list(EmailMessage.EMAIL_SIGNOFF_REGEX.finditer(body_clean))
+        body_clean = EmailMessage.transliterate(body)
 
         # Note we need to ignore the sent from if it is on the first line of the message
         end_of_first_line_index = body_clean.find("\n")
 
+        # Find sign-off or sent from device match for unidecode copy
         # If the signoff match is in the first line of an email, it is likely a mistake (e.g. "Dear Mr. George Best,")
-        signoff_matches = [match for match in signoff_matches if match.start() > end_of_first_line_index]
-
+        signoff_regex, signoff_text = EmailMessage.EMAIL_SIGNOFF_REGEX, body_clean
+        if signoff_regex.flags & re.IGNORECASE:
+            signoff_regex, signoff_text = EmailMessage._lower_case_regex(signoff_regex), body_clean.lower()
+        signoff_matches = EmailMessage._first_match_after(signoff_regex, signoff_text, end_of_first_line_index)
 
         sent_from_device_matches = []
         if end_of_first_line_index != -1:
-            sent_from_device_matches = EmailMessage.SENT_FROM_DEVICE_REGEX.finditer(body_clean)
-            sent_from_device_matches = [
-                match for match in sent_from_device_matches if match.start() > end_of_first_line_index
-            ]
+            sent_from_device_matches = EmailMessage._first_match_after(
+                EmailMessage.SENT_FROM_DEVICE_REGEX, body_clean, end_of_first_line_index
+            )
 
         if include is True:
             # Keep the sign-off
@@ -338,15 +442,18 @@ class EmailMessage(object):
         # Use the unidecode copy to check for matches but remove lines from original body
         body = body.strip()
         body_lines = body.split('\n')
-        body_lines_unidecode = unidecode.unidecode(body).split('\n')
+
+        # Only the first and last lines are checked, so only those need transliterating. unidecode turns the Unicode
+        # line and paragraph separators into line breaks, so split again to get the same lines as a copy of the full body
+        first_line_unidecode = EmailMessage.transliterate(body_lines[0]).split('\n', 1)[0]
+        last_line_unidecode = EmailMessage.transliterate(body_lines[-1]).rsplit('\n', 1)[-1]
 
         # Check if the first line matches and remove
-        if EmailMessage.SENT_FROM_DEVICE_REGEX.match(body_lines_unidecode[0]):
+        if EmailMessage.SENT_FROM_DEVICE_REGEX.match(first_line_unidecode):
             body_lines = body_lines[1:]
 
         # Check if the final line matches, remove, and re-join lines
-        #if SIG_REGEX.match(body_lines_unidecode[-1]):
-        if EmailMessage.SENT_FROM_DEVICE_REGEX.match(body_lines_unidecode[-1]):
+        if EmailMessage.SENT_FROM_DEVICE_REGEX.match(last_line_unidecode):
             body = '\n'.join(body_lines[:-1])
         else:
             body = '\n'.join(body_lines)
@@ -356,51 +463,84 @@ class EmailMessage(object):
 
         return body
 
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _lower_case_regex(regex: re.Pattern) -> re.Pattern:
+        """
+        The sign-offs are only ever searched for in the unidecode copy of the body, which is plain ASCII, so lower-casing
+        both an IGNORECASE pattern and the text gives the same matches at the same positions. Matching without
+        IGNORECASE lets the regex engine skip ahead on the literal first characters of each sign-off rather than trying
+        every alternative at every position. Only the text between escapes is lower-cased, as escapes such as \\S or \\W
+        mean something else in lower case. Memoised on the pattern, so replacing EMAIL_SIGNOFF_REGEX takes effect
+        straight away and each pattern is only ever converted once.
+        """
+        pattern = re.sub(
+            r"\\.|[^\\]+",
+            lambda match: match.group() if match.group().startswith("\\") else match.group().lower(),
+            regex.pattern
+        )
+        return re.compile(pattern, flags=regex.flags & ~re.IGNORECASE)
+
+    @staticmethod
+    def _first_match_after(regex: re.Pattern, text: str, index: int) -> List[re.Match]:
+        """
+        Only the first sign-off and sent from device matches are ever used, so stop scanning the text once one starting
+        after the given index has been found. Returns a list holding that match, or an empty list.
+        """
+        for match in regex.finditer(text):
+            if match.start() > index:
+                return [match]
+
+        return []
+
+    @staticmethod
+    def transliterate(text: str) -> str:
+        """
+        Equivalent to unidecode.unidecode(text), but only does work on the non-ASCII parts of the text.
+        """
+        if text.isascii():
+            return text
+
+        return EmailMessage.NON_ASCII_REGEX.sub(EmailMessage._transliterate_match, text)
+
+    @staticmethod
+    def _transliterate_match(match: re.Match) -> str:
+        transliterated = match.group().translate(EmailMessage._TRANSLITERATION_TABLE)
+        if transliterated.isascii():
+            return transliterated
+
+        # Some characters fall outside of the precomputed table, so let unidecode handle this run
+        return unidecode.unidecode(match.group())
+
     @staticmethod
     def keep_signoff(
             body: str,
             signoff_matches: List[re.Match],
             sent_from_device_matches: List[re.Match],
             word_limit: Optional[int] = None
-    ):
+    ) -> str:
         """
         Find where the signature ends and cut-off the email at that point.
         """
 
         # first handle any sent from iphone stuff
         if len(sent_from_device_matches) > 0:
-            sent_from_device_matches_start = [
-                match.start() for match in sent_from_device_matches
-            ]
-            body = body[:sent_from_device_matches_start[0]]
+            body = body[:sent_from_device_matches[0].start()]
 
         # Find where sign-off ends
-        signoff_matches_end_positions = [
-            signoff_match.end() for signoff_match in signoff_matches
-        ]
+        if len(signoff_matches) > 0 and signoff_matches[0].end() < len(body):
+            signoff_end = signoff_matches[0].end()
 
-        if len(signoff_matches_end_positions) > 0 and signoff_matches_end_positions[0] < len(body):
             # If a sign-off was found, check for a signature
-            end_of_email = body[signoff_matches_end_positions[0]:]
-
-            signature_matches = re.finditer(
-                r"((\w+)[\n.])+|\Z",
-                end_of_email,
-                flags=re.IGNORECASE
-            )
+            signature_match = EmailMessage.EMAIL_SIGNATURE_REGEX.search(body, signoff_end)
 
-            signature_matches_end_positions = [
-                signature_match.end() for signature_match in signature_matches
-            ]
-
-            if len(signature_matches_end_positions) > 0:
-                # If a signature exists, add the two end positions to get the email cut-off point
-                email_cutoff = signoff_matches_end_positions[0] + signature_matches_end_positions[0]
-                body = body[:email_cutoff]
+            if signature_match:
+                # If a signature exists, cut the email off where it ends
+                body = body[:signature_match.end()]
 
             else:
                 # If no signature found, cut email off after the sign-off
-                body = body[:signoff_matches_end_positions[0]]
+                body = body[:signoff_end]
 
         else:
             # If no sign-off found, cut-off after word limit
@@ -414,25 +554,18 @@ class EmailMessage(object):
             signoff_matches: List[re.Match],
             sent_from_device_matches: List[re.Match],
             word_limit: Optional[int] = None
-    ):
+    ) -> str:
         """
         Find where the sign-off starts and cut-off the email at that point.
         """
         # first handle any sent from iphone stuff
         if len(sent_from_device_matches) > 0:
-            sent_from_device_matches_start = [
-                match.start() for match in sent_from_device_matches
-            ]
-            body = body[:sent_from_device_matches_start[0]]
+            body = body[:sent_from_device_matches[0].start()]
 
         # Find where signature starts
-        signoff_matches_start_positions = [
-            signoff_match.start() for signoff_match in signoff_matches
-        ]
-
-        if len(signoff_matches_start_positions) > 0 and signoff_matches_start_positions[0] < len(body):
+        if len(signoff_matches) > 0 and signoff_matches[0].start() < len(body):
             # If a sign-off was found, cut-off email at starting position
-            body = body[:signoff_matches_start_positions[0]]
+            body = body[:signoff_matches[0].start()]
 
         else:
             # If no sign-off found, cut-off at word limit
@@ -441,15 +574,21 @@ class EmailMessage(object):
         return body
 
     @staticmethod
-    def word_limit_cut_off(body, word_limit):
+    def word_limit_cut_off(body: str, word_limit: Optional[int]) -> str:
         """
         Cut-off email at word limit.
         """
         if word_limit is not None:
             # if we can't find the sign-off, let's just take the first 100 words
-            email_body_list = body.replace("\n", " \n").split(" ")
-            newlines_offset = len([word for word in email_body_list if word == " \n"])
-            body = " ".join(email_body_list[:word_limit + newlines_offset]).replace(" \n", "\n")
+            # The words end just before the word_limit-th space or line break, so stop scanning once that is found
+            # rather than splitting up the whole body
+            if word_limit < 1:
+                return ""
+
+            separators = EmailMessage.WORD_SEPARATOR_REGEX.finditer(body)
+            last_separator = next(itertools.islice(separators, word_limit - 1, None), None)
+            if last_separator:
+                body = body[:last_separator.start()]
 
         return body
 
@@ -460,7 +599,7 @@ class EmailMessage(object):
         replace
         """
         for substring in substrings:
-            body = re.sub(substring, "", body)
+            body = body.replace(substring, "")
 
         return body.strip()
 
@@ -469,23 +608,26 @@ class Fragment(object):
     """ A Fragment is a part of
         an Email Message, labeling each part.
     """
+    # A fragment is created for every run of lines, so skip the per-instance __dict__
+    __slots__ = ('signature', 'headers', 'hidden', 'quoted', '_content', 'lines')
 
-    def __init__(self, quoted, first_line, headers=False):
+    def __init__(self, quoted: bool, first_line: str, headers: bool = False):
         self.signature = False
         self.headers = headers
         self.hidden = False
         self.quoted = quoted
-        self._content = None
-        self.lines = [first_line]
+        self._content = ''
+        # Lines are scanned from the bottom of the email up, so each one is added to the front
+        self.lines: Deque[str] = deque([first_line])
 
-    def finish(self):
+    def finish(self) -> None:
         """ Creates block of content with lines
             belonging to fragment.
         """
-        self.lines.reverse()
-        self._content = '\n'.join(self.lines)
-        self.lines = None
+        # Content is only ever read stripped, so strip it once here rather than on every access
+        self._content = '\n'.join(self.lines).strip()
+        self.lines.clear()
 
     @property
-    def content(self):
-        return self._content.strip()
+    def content(self) -> str:
+        return self._content
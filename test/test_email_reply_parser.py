@@ -1,10 +1,26 @@
+import contextlib
+import functools
 import os
-import sys
+import re
+import signal
+import threading
 import unittest
+from unittest import mock
 import time
-from email_reply_parser import EmailReplyParser
+import unidecode
+from email_reply_parser import EmailReplyParser, EmailMessage
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Resolve the fixtures relative to this file so the tests can be run from any working directory
+EMAILS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'emails')
+
+
+@functools.lru_cache(maxsize=None)
+def load_email(name):
+    """ Return the text of a test email, only reading each file from disk once
+        The file is decoded as UTF-8 without newline translation, so the parser sees the line endings as sent
+    """
+    with open(os.path.join(EMAILS_DIR, '%s.txt' % name), 'rb') as f:
+        return f.read().decode('utf-8')
 
 
 class EmailMessageTest(unittest.TestCase):
@@ -12,22 +28,18 @@ class EmailMessageTest(unittest.TestCase):
         message = self.get_email('email_1_1')
 
         self.assertEqual(2, len(message.fragments))
+        # (signature, hidden) for each fragment
         self.assertEqual(
-            [False, True],
-            [f.signature for f in message.fragments]
-        )
-        self.assertEqual(
-            [False, True],
-            [f.hidden for f in message.fragments]
+            ((False, False), (True, True)),
+            tuple((f.signature, f.hidden) for f in message.fragments)
         )
-        self.assertTrue("folks" in message.fragments[0].content)
-        self.assertTrue("riak-users" in message.fragments[1].content)
+        self.assertIn("folks", message.fragments[0].content)
+        self.assertIn("riak-users", message.fragments[1].content)
 
     def test_multiline_reply_headers(self):
         message = self.get_email('email_1_6')
-        print(message)
-        self.assertTrue('I get' in message.fragments[0].content)
-        self.assertTrue('Sent' in message.fragments[1].content)
+        self.assertIn('I get', message.fragments[0].content)
+        self.assertIn('Sent', message.fragments[1].content)
 
     def test_complex_body_with_one_fragment(self):
         message = self.get_email('email_1_5')
@@ -38,69 +50,72 @@ class EmailMessageTest(unittest.TestCase):
         message = self.get_email('correct_sig')
         self.assertEqual(2, len(message.fragments))
 
+        # (quoted, signature, hidden) for each fragment
         self.assertEqual(
-            [False, False],
-            [f.quoted for f in message.fragments]
+            ((False, False, False), (False, True, True)),
+            tuple((f.quoted, f.signature, f.hidden) for f in message.fragments)
         )
 
-        self.assertEqual(
-            [False, True],
-            [f.signature for f in message.fragments]
-        )
-
-        self.assertEqual(
-            [False, True],
-            [f.hidden for f in message.fragments]
-        )
-
-        self.assertTrue('--' in message.fragments[1].content)
+        self.assertIn('--', message.fragments[1].content)
 
     def test_deals_with_windows_line_endings(self):
         msg = self.get_email('email_1_7')
-        self.assertTrue(':+1:' in msg.fragments[0].content)
+        self.assertIn(':+1:', msg.fragments[0].content)
 
     def test_reply_from_gmail(self):
-        with open('emails/email_gmail.txt') as f:
-            self.assertEqual('This is a test for inbox replying to a github message.',
-                             EmailReplyParser.parse_reply(f.read()))
+        self.assertEqual('This is a test for inbox replying to a github message.',
+                         EmailReplyParser.parse_reply(load_email('email_gmail')))
 
     def test_parse_out_just_top_for_outlook_reply(self):
-        with open('emails/email_2_1.txt') as f:
-            self.assertEqual("Outlook with a reply", EmailReplyParser.parse_reply(f.read()))
+        self.assertEqual("Outlook with a reply", EmailReplyParser.parse_reply(load_email('email_2_1')))
 
     def test_parse_out_just_top_for_outlook_with_reply_directly_above_line(self):
-        with open('emails/email_2_2.txt') as f:
-            self.assertEqual("Outlook with a reply directly above line", EmailReplyParser.parse_reply(f.read()))
+        self.assertEqual(
+            "Outlook with a reply directly above line", EmailReplyParser.parse_reply(load_email('email_2_2')))
+
+    def test_outlook_boundary_lines_all_split(self):
+        # Every line directly above a boundary line should be split off, not just the first few
+        text = ''.join('Reply %d\n________\nQuoted\n' % i for i in range(10))
+        message = EmailReplyParser.read(text)
+        self.assertEqual(10, message.text.count('\n\n________'))
 
     def test_parse_out_just_top_for_outlook_with_unusual_headers_format(self):
-        with open('emails/email_2_3.txt') as f:
-            self.assertEqual(
-                "Outlook with a reply above headers using unusual format",
-                EmailReplyParser.parse_reply(f.read()))
+        self.assertEqual(
+            "Outlook with a reply above headers using unusual format",
+            EmailReplyParser.parse_reply(load_email('email_2_3')))
 
     def test_sent_from_iphone(self):
-        with open('emails/email_iPhone.txt') as email:
-            self.assertTrue("Sent from my iPhone" not in EmailReplyParser.parse_reply(email.read()))
+        self.assertNotIn("Sent from my iPhone", EmailReplyParser.parse_reply(load_email('email_iPhone')))
 
     def test_email_one_is_not_on(self):
-        with open('emails/email_one_is_not_on.txt') as email:
-            self.assertTrue(
-                "On Oct 1, 2012, at 11:55 PM, Dave Tapley wrote:" not in EmailReplyParser.parse_reply(email.read()))
+        self.assertNotIn(
+            "On Oct 1, 2012, at 11:55 PM, Dave Tapley wrote:",
+            EmailReplyParser.parse_reply(load_email('email_one_is_not_on')))
 
     def test_partial_quote_header(self):
         message = self.get_email('email_partial_quote_header')
-        self.assertTrue("On your remote host you can run:" in message.reply)
-        self.assertTrue("telnet 127.0.0.1 52698" in message.reply)
-        self.assertTrue("This should connect to TextMate" in message.reply)
+        self.assertIn("On your remote host you can run:", message.reply)
+        self.assertIn("telnet 127.0.0.1 52698", message.reply)
+        self.assertIn("This should connect to TextMate", message.reply)
 
     def test_email_headers_no_delimiter(self):
         message = self.get_email('email_headers_no_delimiter')
         self.assertEqual(message.reply.strip(), 'And another reply!')
 
     def test_pathological_emails(self):
-        t0 = time.time()
-        message = self.get_email("pathological")
-        self.assertTrue(time.time() - t0 < 1, "Took too long")
+        """
+        The header regexes use nested and bounded wildcards, which the backtracking regex engine can take a very long
+        time over on unlucky input (ReDoS). This guards against a pattern change making that blow up again.
+        """
+        # Load the email before starting the clock so only the parsing is timed
+        self.assert_parses_within_budget(load_email("pathological"))
+
+    def test_multi_quote_header_backtracking(self):
+        """
+        Short quote header openers such as the Finnish "ma " and "ti " used to make MULTI_QUOTE_HDR_REGEX try every
+        split of its bounded wildcards before moving on, so a long email full of them took seconds to parse.
+        """
+        self.assert_parses_within_budget("Some text ma ti " * 30000)
 
     def test_doesnt_remove_signature_delimiter_in_mid_line(self):
         message = self.get_email('email_sig_delimiter_in_middle_of_line')
@@ -109,189 +124,281 @@ class EmailMessageTest(unittest.TestCase):
     def get_email(self, name):
         """ Return EmailMessage instance
         """
-        with open('emails/%s.txt' % name) as f:
-            text = f.read()
-        return EmailReplyParser.read(text)
-
-    def test_include_signature_true(self):
-        # Test that the cut_off_at_signature function ends an email after the sign-off when include = True
-        message_english = self.get_email('email_signature')
-        message_german = self.get_email('email_german')
-        message_french = self.get_email('email_french')
-
-        body_english = EmailReplyParser.cut_off_at_signature(message_english.text, include=True, word_limit=100)
-        body_german = EmailReplyParser.cut_off_at_signature(message_german.text, include=True, word_limit=100)
-        body_french = EmailReplyParser.cut_off_at_signature(message_french.text, include=True, word_limit=100)
-
-        assert body_english.endswith('Kind regards,\n\nPerrin Aybara')
-        assert body_german.endswith('Mit freundlichen Grüßen,\n\nLukas')
-        assert body_french.endswith('Bien à vous,\n\nNicolette Baudelaire')
-
-    def test_include_signature_false(self):
-        # Test that the cut_off_at_signature function ends an email before the sign-off when include = False
-        message_english = self.get_email('email_signature')
-        message_german = self.get_email('email_german')
-        message_french = self.get_email('email_french')
-
-        body_english = EmailReplyParser.cut_off_at_signature(message_english.text, include=False, word_limit=100)
-        body_german = EmailReplyParser.cut_off_at_signature(message_german.text, include=False, word_limit=100)
-        body_french = EmailReplyParser.cut_off_at_signature(message_french.text, include=False, word_limit=100)
-
-        assert body_english.endswith('email cut-off point.')
-        assert body_german.endswith('November vornehmen.')
-        assert body_french.endswith("s'il vous plaît?")
+        return EmailReplyParser.read(load_email(name))
+
+    def assert_starts_with(self, text, prefix):
+        """ Same check as text.startswith(prefix), but a failure shows how the text actually starts
+        """
+        self.assertEqual(prefix, text[:len(prefix)])
+
+    def assert_ends_with(self, text, suffix):
+        """ Same check as text.endswith(suffix), but a failure shows how the text actually ends
+        """
+        self.assertEqual(suffix, text[len(text) - len(suffix):])
+
+    def assert_parses_within_budget(self, text):
+        """ Fail if parsing text takes more CPU time than the budget. Slow CI machines can raise the budget
+            On platforms with SIGALRM a runaway parse is also interrupted after ten times the budget, rather than
+            stalling the test run until the regex engine gives up
+        """
+        budget = float(os.environ.get('EMAIL_PARSER_BUDGET_S', '1.0'))
+        # Signal handlers can only be installed from the main thread, so runners that use threads go without the alarm
+        use_alarm = hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+        if use_alarm:
+            def on_alarm(signum, frame):
+                raise self.failureException("Parsing was interrupted after %gs" % (10 * budget))
+            previous_handler = signal.signal(signal.SIGALRM, on_alarm)
+            signal.setitimer(signal.ITIMER_REAL, 10 * budget)
+        try:
+            # Budget on CPU time so other processes competing for the machine don't make this flaky
+            t0 = time.process_time()
+            EmailReplyParser.read(text)
+            self.assertLess(time.process_time() - t0, budget, "Took too long")
+        finally:
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, previous_handler)
+
+    def test_include_signature(self):
+        # Test that the cut_off_at_signature function ends an email after the sign-off when include = True and before
+        # the sign-off when include = False. Each email is read from disk once and cut off both ways
+        expected_endings = {
+            'email_signature': ('Kind regards,\n\nPerrin Aybara', 'email cut-off point.'),
+            'email_german': ('Mit freundlichen Grüßen,\n\nLukas', 'November vornehmen.'),
+            'email_french': ('Bien à vous,\n\nNicolette Baudelaire', "s'il vous plaît?"),
+        }
+        for name, (ending_with_signoff, ending_without_signoff) in expected_endings.items():
+            text = load_email(name)
+            for include, ending in ((True, ending_with_signoff), (False, ending_without_signoff)):
+                with self.subTest(name=name, include=include):
+                    body = EmailReplyParser.cut_off_at_signature(text, include=include, word_limit=100)
+                    self.assert_ends_with(body, ending)
 
     def test_word_limit(self):
         # Test that a long email cuts off after the default or given word limit
         message = self.get_email('long_passage')
-        body_default_limit = EmailReplyParser.cut_off_at_signature(message.text, word_limit=100)  # Default value
-        body_short = EmailReplyParser.cut_off_at_signature(message.text, word_limit=10)  # Less than default
-        body_long = EmailReplyParser.cut_off_at_signature(message.text, word_limit=500)  # More than default
+        body_default_limit = message.cut_off_at_signature(word_limit=100)  # Default value
+        body_short = message.cut_off_at_signature(word_limit=10)  # Less than default
+        body_long = message.cut_off_at_signature(word_limit=500)  # More than default
 
-        assert body_default_limit.endswith('"HERE IS ONE HUNDRED!"')
-        assert body_short.endswith('TEN!')
-        assert body_long.endswith('FIVE HUNDRED IS HERE!')
+        self.assert_ends_with(body_default_limit, '"HERE IS ONE HUNDRED!"')
+        self.assert_ends_with(body_short, 'TEN!')
+        self.assert_ends_with(body_long, 'FIVE HUNDRED IS HERE!')
 
     def test_clean_email_portuguese(self):
         # Test Portuguese regex
         message = self.get_email('email_portuguese')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=False, word_limit=100)
-        assert body.endswith("Cumprimentos\nPedro Mota")
+        body = message.cut_off_at_signature(include=False, word_limit=100)
+        self.assert_ends_with(body, "Cumprimentos\nPedro Mota")
 
     def test_clean_email_french(self):
         # Test Portuguese regex
         message = self.get_email('email_french_accent_sent_on')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=False, word_limit=100)
-        assert body == "Bonjour, ca va bien!"
+        body = message.cut_off_at_signature(include=False, word_limit=100)
+        self.assertEqual("Bonjour, ca va bien!", body)
+
+    def test_transliterate_matches_unidecode(self):
+        # The fast paths must give exactly what unidecode would, including characters outside of the lookup table
+        for text in ["Plain ASCII text", "Très cordialement,\nMit freundlichen Grüßen", "Στάλθηκε από το iPhone μου"]:
+            self.assertEqual(unidecode.unidecode(text), EmailMessage.transliterate(text))
+
+    def test_lower_case_signoff_regex_keeps_escapes(self):
+        # Lower-casing the sign-off pattern must only touch literal text, never turn an escape like \S into \s
+        escape = re.compile(r"\\.")
+        original = EmailMessage.EMAIL_SIGNOFF_REGEX.pattern
+        lowered = EmailMessage._lower_case_regex(EmailMessage.EMAIL_SIGNOFF_REGEX).pattern
+        self.assertEqual(escape.findall(original), escape.findall(lowered))
+        self.assertEqual(escape.sub('', original).lower(), escape.sub('', lowered))
+
+    def test_replaced_signoff_regex_is_used(self):
+        # The lower-cased copy of the sign-off pattern is made from whatever EMAIL_SIGNOFF_REGEX currently holds
+        text = "Hi,\n\nThe order has shipped.\n\nTalk Soon\nJohn"
+        EmailReplyParser.clear_cache()
+        self.assertEqual(text, EmailReplyParser.cut_off_at_signature(text, include=False))
+        regex = re.compile(r"(talk soon)(,|\n)", flags=re.IGNORECASE)
+        with mock.patch.object(EmailMessage, 'EMAIL_SIGNOFF_REGEX', regex):
+            EmailReplyParser.clear_cache()
+            self.assertEqual(
+                "Hi,\n\nThe order has shipped.", EmailReplyParser.cut_off_at_signature(text, include=False)
+            )
+        EmailReplyParser.clear_cache()
+
+    def test_cut_off_at_signature_is_cached(self):
+        cache_info = EmailReplyParser._cached_cut_off_at_signature.cache_info
+        text = load_email('email_portuguese')
+        first = EmailReplyParser.cut_off_at_signature(text, include=False, word_limit=100)
+        hits = cache_info().hits
+        second = EmailReplyParser.cut_off_at_signature(text, include=False, word_limit=100)
+        self.assertEqual(first, second)
+        self.assertEqual(hits + 1, cache_info().hits)
+
+        # Long bodies are not kept in the cache
+        size = cache_info().currsize
+        EmailReplyParser.cut_off_at_signature("word " * EmailReplyParser.CACHE_MAX_BODY_LENGTH)
+        self.assertEqual(size, cache_info().currsize)
+
+        EmailReplyParser.clear_cache()
+        self.assertEqual(0, cache_info().currsize)
+
+    def test_cut_off_at_signature_cache_keys(self):
+        # Only include=True keeps the sign-off, so a truthy 1 must not be served the include=True result
+        text = load_email('email_signature')
+        EmailReplyParser.cut_off_at_signature(text, include=True)
+        self.assertEqual(
+            EmailMessage(text).cut_off_at_signature(include=1), EmailReplyParser.cut_off_at_signature(text, include=1)
+        )
+        # Warnings added to EMAIL_HEADER_WARNINGS apply to emails that were already cleaned
+        text = "Hi,\n\nBANNER Please find it attached.\n\nThanks"
+        self.assertIn('BANNER', EmailReplyParser.cut_off_at_signature(text))
+        with mock.patch.object(EmailMessage, 'EMAIL_HEADER_WARNINGS', EmailMessage.EMAIL_HEADER_WARNINGS + ['BANNER']):
+            self.assertNotIn('BANNER', EmailReplyParser.cut_off_at_signature(text))
+
+    def test_message_cut_off_at_signature(self):
+        # A message that has already been read is cut off using its own fragments
+        message = self.get_email('email_signature')
+        self.assertEqual(
+            'Hi Mat,\n\nThis is a sample email to test regex/email cut-off point.\n\nKind regards,\n\nPerrin Aybara',
+            message.cut_off_at_signature(include=True)
+        )
+        self.assertEqual(
+            'Hi Mat,\n\nThis is a sample email to test regex/email cut-off point.',
+            message.cut_off_at_signature(include=False)
+        )
+        # A message that hasn't been read yet is read first
+        message = EmailMessage(load_email('sent_from_device_in_thread_dutch'))
+        self.assertEqual("Yes that would be fine", message.cut_off_at_signature())
+        self.assertTrue(message.fragments)
+
+    def test_no_regex_compiled_per_call(self):
+        # Every pattern should be compiled once, so parsing an email never goes through the re module's own functions
+        # (and its pattern cache). Parse one email first so the lower-cased sign-off pattern already exists, then clear
+        # the result cache so the emails really are parsed
+        names = ('email_signature', 'email_german', 'email_iphone_polish', 'email_greek_1', 'long_passage')
+        functions = ('compile', 'match', 'fullmatch', 'search', 'finditer', 'findall', 'split', 'sub', 'subn')
+        EmailReplyParser.cut_off_at_signature(load_email(names[0]))
+        EmailReplyParser.clear_cache()
+        with contextlib.ExitStack() as stack:
+            mocks = [stack.enter_context(mock.patch.object(re, name, wraps=getattr(re, name))) for name in functions]
+            for name in names:
+                for include in (True, False):
+                    EmailReplyParser.cut_off_at_signature(load_email(name), include=include)
+        for name, patched in zip(functions, mocks):
+            with self.subTest(function=name):
+                self.assertFalse(patched.called)
+
+    def test_parse_batch(self):
+        bodies = [load_email(name) for name in ('email_portuguese', 'email_french_accent_sent_on', 'email_1_1')]
+        # Work the expected results out without going through the cache, and empty it before each batch (forked
+        # workers inherit it), so the batch really parses every email
+        expected = [EmailMessage(body).cut_off_at_signature(include=False, word_limit=100) for body in bodies]
+        # A batch this small is normally cleaned in-process, so lower the threshold to also check the worker pool
+        for min_pool_size in (EmailReplyParser.PARSE_BATCH_MIN_POOL_SIZE, 0):
+            EmailReplyParser.clear_cache()
+            with self.subTest(min_pool_size=min_pool_size), \
+                    mock.patch.object(EmailReplyParser, 'PARSE_BATCH_MIN_POOL_SIZE', min_pool_size):
+                self.assertEqual(
+                    expected, EmailReplyParser.parse_batch(bodies, include=False, word_limit=100, max_workers=2)
+                )
+        # An invalid worker count is rejected even when the batch would be cleaned in-process
+        with self.assertRaises(ValueError):
+            EmailReplyParser.parse_batch(bodies, max_workers=0)
 
     def test_clean_email_content_no_change(self):
         # Ensure that a short email with no reply and no signature doesn't change
         message = self.get_email('email_one_line')
-        clean_content = EmailReplyParser.cut_off_at_signature(body=message.text, word_limit=1000)
+        clean_content = message.cut_off_at_signature(word_limit=1000)
         self.assertEqual(message.text, clean_content)
 
     def test_end_of_email(self):
         # Check that an email that continues after the sign-off (without being a header or reply) cuts off at signature
         message = self.get_email('email_continue_after_signoff')
-        body = EmailReplyParser.cut_off_at_signature(message.text)
-        assert body.endswith('Tom Bombadil')
+        body = message.cut_off_at_signature()
+        self.assert_ends_with(body, 'Tom Bombadil')
 
     def test_keep_newlines_when_no_signoff(self):
         # Test that when there is no sign-off message detected at the end, the newlines/spacing are not changed
         message = self.get_email('email_no_signature')
-        body = EmailReplyParser.cut_off_at_signature(message.text)
-        assert body.endswith("Let's see if it works.\n\nK")
+        body = message.cut_off_at_signature()
+        self.assert_ends_with(body, "Let's see if it works.\n\nK")
 
     def test_remove_SIG_REGEX_end(self):
         # Test that any "Sent from iPhone" messages are removed at the end of an email
-        message_french = self.get_email('email_iphone_french')
-        message_portuguese = self.get_email('email_iphone_portuguese')
-        message_polish = self.get_email('email_iphone_polish')
-        message_finnish = self.get_email('email_iphone_finnish')
-
-        body_french = EmailReplyParser.cut_off_at_signature(message_french.text)
-        body_portuguese = EmailReplyParser.cut_off_at_signature(message_portuguese.text)
-        body_polish = EmailReplyParser.cut_off_at_signature(message_polish.text)
-        body_finnish = EmailReplyParser.cut_off_at_signature(message_finnish.text)
-
-        assert body_french.endswith("Au revoir,\n\nKelsier")
-        assert body_portuguese.endswith("Adeus,\n\nOtis")
-        assert body_polish.endswith("Do widzenia,\n\nTriss")
-        assert body_finnish.endswith("Hyvästi,\n\nTorin")
+        expected_endings = {
+            'email_iphone_french': "Au revoir,\n\nKelsier",
+            'email_iphone_portuguese': "Adeus,\n\nOtis",
+            'email_iphone_polish': "Do widzenia,\n\nTriss",
+            'email_iphone_finnish': "Hyvästi,\n\nTorin",
+        }
+        for name, ending in expected_endings.items():
+            with self.subTest(name=name):
+                body = self.get_email(name).cut_off_at_signature()
+                self.assert_ends_with(body, ending)
 
     def test_remove_SIG_REGEX_start(self):
         # Test that any "Sent from iPhone" messages are removed at the beginning of an email
         message_english = self.get_email('email_iphone_start')
         message_german = self.get_email('email_iphone_start_german')
-        body_english = EmailReplyParser.cut_off_at_signature(message_english.text)
-        body_german = EmailReplyParser.cut_off_at_signature(message_german.text)
-        assert body_english.startswith('Hi,\n\nCase where the')
-        assert body_german.startswith('Hallo,\n\nFall, in dem das')
+        body_english = message_english.cut_off_at_signature()
+        body_german = message_german.cut_off_at_signature()
+        self.assert_starts_with(body_english, 'Hi,\n\nCase where the')
+        self.assert_starts_with(body_german, 'Hallo,\n\nFall, in dem das')
 
 
     def test_parse_response_headers(self):
         """
         Tests that we are parsing out email response headers correctly for multiple languages
         """
-        message = self.get_email('email_polish_1')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-        assert body == "Ten tekst powinien pojawić się w treści"
-
-        message = self.get_email('email_polish_2')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-        assert body == "Ten tekst powinien pojawić się w treści"
-
-        message = self.get_email('email_polish_3')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-        assert body == "Ten tekst powinien pojawić się w treści"
-
-        message = self.get_email('email_polish_4')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-        assert body == "Ten tekst powinien pojawić się w treści"
-
-        message = self.get_email('email_greek_1')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-        assert body.endswith("Από τον Άδη")
-
-        message = self.get_email('email_malformed_thread_header')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-
-        assert body.endswith("que cet e-mail est analysé correctement")
-
-        message = self.get_email('email_with_two_headers')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-
-        assert body == "This is the main content"
-
-        message = self.get_email('email_portuguese_1')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-        assert body == "This is the main body"
-
-        message = self.get_email('email_portuguese_2')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-        assert body == "Here is the actual email"
-
-        message = self.get_email('email_portuguese_3')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-        assert body.startswith("This is a test")
-        assert body.endswith("This should be included")
-
-        message = self.get_email('email_romanian_1')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-        assert body == "This is the actual email"
-
-        message = self.get_email('email_german_2')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-        assert body == "This is a german email"
+        # Emails where everything but the reply should be cut off
+        expected_bodies = {
+            'email_polish_1': "Ten tekst powinien pojawić się w treści",
+            'email_polish_2': "Ten tekst powinien pojawić się w treści",
+            'email_polish_3': "Ten tekst powinien pojawić się w treści",
+            'email_polish_4': "Ten tekst powinien pojawić się w treści",
+            'email_with_two_headers': "This is the main content",
+            'email_portuguese_1': "This is the main body",
+            'email_portuguese_2': "Here is the actual email",
+            'email_romanian_1': "This is the actual email",
+            'email_german_2': "This is a german email",
+        }
+        # Goes through the static API, with the cache emptied so each email really is parsed
+        EmailReplyParser.clear_cache()
+        for name, expected_body in expected_bodies.items():
+            with self.subTest(name=name):
+                body = EmailReplyParser.cut_off_at_signature(load_email(name), include=True)
+                self.assertEqual(expected_body, body)
+
+        # Emails where only the start and/or end of the reply is checked
+        expected_bounds = {
+            'email_greek_1': ("", "Από τον Άδη"),
+            'email_malformed_thread_header': ("", "que cet e-mail est analysé correctement"),
+            'email_portuguese_3': ("This is a test", "This should be included"),
+        }
+        for name, (expected_start, expected_end) in expected_bounds.items():
+            with self.subTest(name=name):
+                message = self.get_email(name)
+                body = message.cut_off_at_signature(include=True)
+                self.assert_starts_with(body, expected_start)
+                self.assert_ends_with(body, expected_end)
 
     def test_sent_from_device_in_thread(self):
         """
         Tests that if the thread becomes malformed we will be able to parse out the correct part if a sent from device is present
         """
         message = self.get_email("sent_from_device_in_thread")
-        body = EmailReplyParser.cut_off_at_signature(message.text)
+        body = message.cut_off_at_signature()
 
-        assert body == "Yes that would be fine"
+        self.assertEqual("Yes that would be fine", body)
 
 
     def test_sent_from_device_in_thread_languages(self):
         """
         Tests that if the thread becomes malformed we will be able to parse out the correct part if a sent from device is present
         """
-        message_english = self.get_email("sent_from_device_in_thread_english")
-        message_hungarian = self.get_email("sent_from_device_in_thread_hungarian")
-        message_dutch = self.get_email("sent_from_device_in_thread_dutch")
-        message_romanian = self.get_email("sent_from_device_in_thread_romanian")
-
-        body_english = EmailReplyParser.cut_off_at_signature(message_english.text)
-        body_hungarian = EmailReplyParser.cut_off_at_signature(message_hungarian.text)
-        body_dutch = EmailReplyParser.cut_off_at_signature(message_dutch.text)
-        body_romanian = EmailReplyParser.cut_off_at_signature(message_romanian.text)
-
-        assert body_english == "Yes that would be fine"
-        assert body_hungarian == "Yes that would be fine"
-        assert body_dutch == "Yes that would be fine"
-        assert body_romanian == "Yes that would be fine"
+        for language in ('english', 'hungarian', 'dutch', 'romanian'):
+            with self.subTest(language=language):
+                message = self.get_email("sent_from_device_in_thread_%s" % language)
+                body = message.cut_off_at_signature()
+                self.assertEqual("Yes that would be fine", body)
 
     def test_remove_non_alphabetic_signature_patter(self):
         """
@@ -299,39 +406,39 @@ class EmailMessageTest(unittest.TestCase):
         """
 
         message_stars_signoff = self.get_email("email_with_stars_signoff")
-        body = EmailReplyParser.cut_off_at_signature(message_stars_signoff.text)
-        assert body.endswith("Jim")
+        body = message_stars_signoff.cut_off_at_signature()
+        self.assert_ends_with(body, "Jim")
 
         message_dash_signoff = self.get_email("email_signature")
-        body = EmailReplyParser.cut_off_at_signature(message_dash_signoff.text)
-        assert body.endswith("Perrin Aybara")
+        body = message_dash_signoff.cut_off_at_signature()
+        self.assert_ends_with(body, "Perrin Aybara")
 
         message_bullets = self.get_email("email_with_bullets")
-        body = EmailReplyParser.cut_off_at_signature(message_bullets.text)
-        assert body.endswith("Jane")
+        body = message_bullets.cut_off_at_signature()
+        self.assert_ends_with(body, "Jane")
 
     def test_remove_quoted_text(self):
         """Tests that we cut off an email correctly once we see quoted text '>'"""
         message = self.get_email("email_with_quoted_text")
-        body = EmailReplyParser.cut_off_at_signature(message.text)
-        assert body.endswith("Tony")
+        body = message.cut_off_at_signature()
+        self.assert_ends_with(body, "Tony")
 
     def test_spanish_signoff(self):
         """
         Tests that we're parsing the 'On Jan 31 X wrote:' correctly in Spanish.
         """
         message = self.get_email('spanish_signoff')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-        assert body.endswith('Salud')
+        body = message.cut_off_at_signature(include=True)
+        self.assert_ends_with(body, 'Salud')
 
     def test_remove_header_warnings(self):
         """
         Tests that we remove any warnings about external emails at the top of emails
         """
         message = self.get_email('email_with_header_warning')
-        body = EmailReplyParser.cut_off_at_signature(message.text, include=True)
-        assert body.startswith('Hi,')
-        assert body.endswith('Thanks')
+        body = message.cut_off_at_signature(include=True)
+        self.assert_starts_with(body, 'Hi,')
+        self.assert_ends_with(body, 'Thanks')
 
 
     def test_dont_cut_signature_at_start_of_email(self):
@@ -342,13 +449,13 @@ class EmailMessageTest(unittest.TestCase):
         first_message = self.get_email("george_best")
         second_message = self.get_email("dutch_beste_example")
 
-        body_first_message = EmailReplyParser.cut_off_at_signature(first_message.text)
-        body_second_message = EmailReplyParser.cut_off_at_signature(second_message.text)
+        body_first_message = first_message.cut_off_at_signature()
+        body_second_message = second_message.cut_off_at_signature()
 
-        assert body_first_message.startswith("Dear George Best,")
-        assert body_first_message.endswith("Phil")
-        assert body_second_message.startswith("Beste,")
-        assert body_second_message.endswith("Timmy")
+        self.assert_starts_with(body_first_message, "Dear George Best,")
+        self.assert_ends_with(body_first_message, "Phil")
+        self.assert_starts_with(body_second_message, "Beste,")
+        self.assert_ends_with(body_second_message, "Timmy")
 
 if __name__ == '__main__':
     unittest.main()